@@ -1,5 +1,7 @@
 import hashlib
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_left
+from dataclasses import InitVar, dataclass, field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -8,7 +10,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-@dataclass
+def calculate_content_hash(data: bytes) -> str:
+    """计算内容哈希（SHA-256，支持 SHA-NI 的 CPU 上由硬件加速）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclass(slots=True)
 class DocumentChunkPosition:
     """文档分块位置信息"""
 
@@ -54,7 +61,7 @@ class DocumentChunkPosition:
         return self.overlap_start + self.overlap_end
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentChunk:
     """文档分块类"""
 
@@ -72,21 +79,21 @@ class DocumentChunk:
     content_hash: Optional[str] = None  # 内容哈希
     tokens_count: Optional[int] = None  # token数量
     created_at: Optional[datetime] = None
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
 
-    def __post_init__(self):
+    # 是否在创建时计算内容哈希（关闭后由 ensure_content_hash 按需计算）
+    compute_hash: InitVar[bool] = True
+
+    def __post_init__(self, compute_hash: bool):
         if self.created_at is None:
             self.created_at = datetime.now()
 
-        if self.content_hash is None:
-            self.content_hash = hashlib.md5(self.content.encode()).hexdigest()
+        if self.content_hash is None and compute_hash:
+            self.content_hash = calculate_content_hash(self.content.encode("utf-8"))
 
         if self.actual_chunk_size == 0:
             self.actual_chunk_size = len(self.content)
 
-        if self.metadata is None:
-            self.metadata = {}
-
     @property
     def content_without_overlap(self) -> str:
         """获取不包含重叠的内容"""
@@ -108,6 +115,12 @@ class DocumentChunk:
             return ""
         return self.content[-self.position.overlap_end :]
 
+    def ensure_content_hash(self) -> str:
+        """获取内容哈希，尚未计算时按需计算"""
+        if self.content_hash is None:
+            self.content_hash = calculate_content_hash(self.content.encode("utf-8"))
+        return self.content_hash
+
     def get_absolute_position(self, relative_pos: int) -> int:
         """将相对位置转换为文档中的绝对位置"""
         return self.position.char_start + relative_pos
@@ -117,7 +130,7 @@ class DocumentChunk:
         return absolute_pos - self.position.char_start
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseDocument:
     """文档类"""
 
@@ -134,10 +147,18 @@ class BaseDocument:
 
     # 文档信息
     content: Optional[str] = None  # 原始内容
-    chunks: Optional[List[DocumentChunk]] = None  # 分块列表
+    chunks: List[DocumentChunk] = field(default_factory=list)  # 分块列表
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    # 分块位置列存储（与 chunks 一一对应，按列连续存放 int64，用于二分查找）
+    _chunk_starts: array = field(
+        default_factory=lambda: array("q"), init=False, repr=False, compare=False
+    )
+    _chunk_ends: array = field(
+        default_factory=lambda: array("q"), init=False, repr=False, compare=False
+    )
 
     def __post_init__(self):
         if self.created_at is None:
@@ -146,12 +167,6 @@ class BaseDocument:
         if self.updated_at is None:
             self.updated_at = self.created_at
 
-        if self.chunks is None:
-            self.chunks = []
-
-        if self.metadata is None:
-            self.metadata = {}
-
     @property
     def chunk_count(self) -> int:
         """获取分块数量"""
@@ -162,11 +177,36 @@ class BaseDocument:
         if chunk.doc_id != self.doc_id:
             raise ValueError("分块不属于当前文档")
         self.chunks.append(chunk)
+        self._chunk_starts.append(chunk.position.char_start)
+        self._chunk_ends.append(chunk.position.char_end)
+        self.updated_at = datetime.now()
+
+    def add_chunks(self, chunks: List[DocumentChunk]):
+        """批量添加分块（整批只更新一次 updated_at）"""
+        if any(chunk.doc_id != self.doc_id for chunk in chunks):
+            raise ValueError("分块不属于当前文档")
+        self.chunks.extend(chunks)
+        self._chunk_starts.extend(chunk.position.char_start for chunk in chunks)
+        self._chunk_ends.extend(chunk.position.char_end for chunk in chunks)
         self.updated_at = datetime.now()
 
     def get_chunk_by_position(self, char_position: int) -> Optional[DocumentChunk]:
-        """根据字符位置获取分块"""
-        for chunk in self.chunks:
-            if chunk.position.char_start <= char_position <= chunk.position.char_end:
-                return chunk
+        """根据字符位置获取分块（分块按位置升序排列，重叠区域返回靠前的分块）"""
+        if len(self._chunk_ends) != len(self.chunks):
+            # chunks 可能被直接赋值或修改，重建索引
+            self._rebuild_position_columns()
+
+        # 第一个结束位置 >= char_position 的分块
+        i = bisect_left(self._chunk_ends, char_position)
+        if i < len(self._chunk_ends) and self._chunk_starts[i] <= char_position:
+            return self.chunks[i]
         return None
+
+    def _rebuild_position_columns(self):
+        """根据 chunks 重建位置列"""
+        self._chunk_starts = array(
+            "q", [chunk.position.char_start for chunk in self.chunks]
+        )
+        self._chunk_ends = array(
+            "q", [chunk.position.char_end for chunk in self.chunks]
+        )
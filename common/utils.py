@@ -1,8 +1,76 @@
 import hashlib
+import zipfile
+from typing import List
+
+from lxml import etree
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_BODY = _W + "body"
+_W_P = _W + "p"
+_W_R = _W + "r"
+_W_HYPERLINK = _W + "hyperlink"
+_W_T = _W + "t"
+_W_BR = _W + "br"
+_W_BR_TYPE = _W + "type"
+# run 中除 w:t、w:br 外的内容元素及其等价文本（与 python-docx 的 Run.text 一致）
+_W_RUN_CHARS = {
+    _W + "tab": "\t",
+    _W + "ptab": "\t",
+    _W + "cr": "\n",
+    _W + "noBreakHyphen": "-",
+}
 
 
 def calculate_md5_file(file_path: str) -> str:
+    # 整个文件共用一个哈希对象；file_digest 内部用 readinto 复用缓冲区分块读取
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hashlib.md5().update(chunk)
-    return hashlib.md5().hexdigest()
+        return hashlib.file_digest(f, "md5").hexdigest()
+
+
+def _append_run_text(run, parts: List[str]):
+    for child in run:
+        tag = child.tag
+        if tag == _W_T:
+            parts.append(child.text or "")
+        elif tag == _W_BR:
+            # 只有换行符对应 "\n"，分页、分栏符没有文本
+            if child.get(_W_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _W_RUN_CHARS:
+            parts.append(_W_RUN_CHARS[tag])
+
+
+def _paragraph_text(paragraph) -> str:
+    # 只取段落直接子元素中的 w:r 与 w:hyperlink，与 python-docx 的 Paragraph.text 一致
+    parts = []
+    for child in paragraph:
+        if child.tag == _W_R:
+            _append_run_text(child, parts)
+        elif child.tag == _W_HYPERLINK:
+            for run in child.iterchildren(_W_R):
+                _append_run_text(run, parts)
+    return "".join(parts)
+
+
+def extract_docx_paragraph_texts(file_path: str) -> List[str]:
+    """
+    流式提取 docx 正文段落文本（等价于 python-docx 的 [p.text for p in doc.paragraphs]）
+
+    直接从 zip 中以 iterparse 读取 word/document.xml，不构建完整的文档对象模型，
+    正文的每个顶层元素处理完即释放
+    """
+    texts = []
+    with zipfile.ZipFile(file_path) as z, z.open("word/document.xml") as f:
+        for _, element in etree.iterparse(f, events=("end",)):
+            parent = element.getparent()
+            if parent is None or parent.tag != _W_BODY:
+                continue
+
+            if element.tag == _W_P:
+                texts.append(_paragraph_text(element))
+
+            # 释放已处理的正文元素
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+    return texts
@@ -6,10 +6,11 @@ from io import BytesIO
 
 import fitz  # PyMuPDF
 from PIL import Image
-from docx import Document
 from docx2pdf import convert
 from dotenv import load_dotenv
 
+from common.utils import extract_docx_paragraph_texts
+
 load_dotenv()
 
 
@@ -42,16 +43,19 @@ def process_pdf(file_data):
     """处理PDF文件"""
     doc = fitz.open(stream=file_data, filetype="pdf")
 
-    text_content = ""
+    # 各页文本先收集到列表，最后一次性拼接
+    text_parts = []
     page_info = []
 
     for page_num in range(doc.page_count):
         page = doc[page_num]
-        page_text = page.get_text()
-        text_content += f"\n--- 第{page_num + 1}页 ---\n{page_text}"
+        # 每页只解析一次文本，纯文本与文本块位置信息共用同一个 TextPage
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_DICT)
+        page_text = page.get_text(textpage=textpage)
+        text_parts.append(f"\n--- 第{page_num + 1}页 ---\n{page_text}")
 
         # 获取文本块位置信息
-        blocks = page.get_text("dict")
+        blocks = page.get_text("dict", textpage=textpage)
         page_info.append({"page_num": page_num, "blocks": blocks})
 
     # 保存PDF到字节流
@@ -59,7 +63,7 @@ def process_pdf(file_data):
     doc.save(pdf_bytes)
     doc.close()
 
-    return pdf_bytes.getvalue(), text_content, page_info
+    return pdf_bytes.getvalue(), "".join(text_parts), page_info
 
 
 # ??????
@@ -75,14 +79,11 @@ def process_word_to_pdf(file_data):
         pdf_file_path = pdf_file.name
 
     try:
-        # 使用python-docx提取文本
-        doc = Document(word_file_path)
-        text_content = ""
+        # 流式解析 document.xml 提取段落文本，不构建 python-docx 对象模型
+        paragraph_texts = extract_docx_paragraph_texts(word_file_path)
+        text_content = "".join([text + "\n" for text in paragraph_texts])
         page_info = []
 
-        for i, paragraph in enumerate(doc.paragraphs):
-            text_content += paragraph.text + "\n"
-
         # 转换为PDF
         convert(word_file_path, pdf_file_path)
 
@@ -90,8 +91,8 @@ def process_word_to_pdf(file_data):
         with open(pdf_file_path, "rb") as f:
             pdf_data = f.read()
 
-        # 获取PDF的结构信息
-        pdf_doc = fitz.open(pdf_file_path)
+        # 获取PDF的结构信息（直接用已读入的字节打开，不再重复读文件）
+        pdf_doc = fitz.open(stream=pdf_data, filetype="pdf")
         for page_num in range(pdf_doc.page_count):
             page = pdf_doc[page_num]
             blocks = page.get_text("dict")
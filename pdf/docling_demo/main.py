@@ -1,7 +1,9 @@
+import io
 import json
 import logging
 import multiprocessing
 import os
+import sys
 import time
 from pathlib import Path
 from typing import List
@@ -227,14 +229,22 @@ def main():
         chunker = HybridChunker()
         chunk_iter = chunker.chunk(dl_doc=doc)
 
+        # 收集可直接用于向量化的分块文本，输出先写入缓冲区，最后一次性写到标准输出
+        enriched_texts: List[str] = []
+        buf = io.StringIO()
         for i, chunk in enumerate(chunk_iter):
-            print(f"=== {i} ===")
-            print(f"chunk.text:\n{f'{chunk.text[:300]}…'!r}")
-
             enriched_text = chunker.contextualize(chunk=chunk)
-            print(f"chunker.contextualize(chunk):\n{f'{enriched_text[:300]}…'!r}")
+            enriched_texts.append(enriched_text)
+
+            buf.write(
+                f"=== {i} ===\n"
+                f"chunk.text:\n{f'{chunk.text[:300]}…'!r}\n"
+                f"chunker.contextualize(chunk):\n{f'{enriched_text[:300]}…'!r}\n"
+                "\n"
+            )
+        sys.stdout.write(buf.getvalue())
 
-            print()
+        _log.info(f"分块完成，分块数量 {len(enriched_texts)} ..........")
 
     finally:
         # 清理其他可能的资源...
@@ -1,7 +1,8 @@
 import os
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 
-import fitz
 import pymupdf
 from dotenv import load_dotenv
 
@@ -11,15 +12,41 @@ from common.utils import calculate_md5_file
 load_dotenv()
 
 
-def parse_document(doc: BaseDocument) -> BaseDocument | None:
-    if doc.file_extension_name == "pdf":
-        pdf = pymupdf.open(file_path)
+# 每个子进程至少处理的页数，页数较少时直接在当前进程提取，避免进程启动开销
+MIN_PAGES_PER_WORKER = 8
+
+
+def _extract_pages_text(file_path: str, start: int, end: int) -> List[str]:
+    """提取 [start, end) 页的文本（在子进程中各自打开文档，不传递 Document 对象）"""
+    with pymupdf.open(file_path) as pdf:
+        return [pdf[page_num].get_text("text") for page_num in range(start, end)]
+
 
-        for page_num in range(pdf.page_count):
-            page: fitz.Document = pdf[page_num]
+def extract_pages_text(file_path: str, max_workers: int | None = None) -> List[str]:
+    """按页提取文本，页数较多时把页码区间分给多个进程并行处理，结果保持页序"""
+    with pymupdf.open(file_path) as pdf:
+        page_count = pdf.page_count
+
+    workers = min(
+        max_workers or os.cpu_count() or 1, page_count // MIN_PAGES_PER_WORKER
+    )
+    if workers <= 1:
+        return _extract_pages_text(file_path, 0, page_count)
+
+    step = -(-page_count // workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _extract_pages_text, file_path, start, min(start + step, page_count)
+            )
+            for start in range(0, page_count, step)
+        ]
+        return [text for future in futures for text in future.result()]
 
-            text = page.get_text("text")
 
+def parse_document(doc: BaseDocument) -> BaseDocument | None:
+    if doc.file_extension_name == "pdf":
+        for text in extract_pages_text(doc.file_path):
             print(text)
 
     return None
@@ -1,32 +1,178 @@
 import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, List, Tuple
 
 import fitz
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# 每个子进程至少处理的页数，页数较少时直接在当前进程提取，避免进程启动开销
+MIN_PAGES_PER_WORKER = 8
+# span 提取只需要文本，不保留图片块，避免 MuPDF 在图片多的页面上解码并复制图片数据
+SPAN_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
 
-def parse_document(file_path):
+
+@dataclass(slots=True)
+class SpanTable:
+    """
+    文本片段表（按列存储），避免每个片段一个字典
+
+    bboxes 按 (x0, y0, x1, y1) 平铺存放，第 i 个片段的坐标为 bboxes[4 * i : 4 * i + 4]；
+    按下标或遍历访问时返回与原 text_blocks 元素相同结构的字典
+    """
+
+    texts: List[str] = field(default_factory=list)
+    bboxes: array = field(default_factory=lambda: array("d"))  # 位置坐标
+    pages: array = field(default_factory=lambda: array("i"))
+    fonts: List[str] = field(default_factory=list)
+    sizes: array = field(default_factory=lambda: array("d"))
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> dict:
+        return {
+            "text": self.texts[index],
+            "bbox": self.bbox(index),
+            "page": self.pages[index],
+            "font": self.fonts[index],
+            "size": self.sizes[index],
+        }
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self[i] for i in range(len(self)))
+
+    def bbox(self, index: int) -> Tuple[float, float, float, float]:
+        """获取第 index 个片段的位置坐标"""
+        return tuple(self.bboxes[4 * index : 4 * index + 4])
+
+    def extend(self, other: "SpanTable"):
+        """追加另一个表的所有片段"""
+        self.texts.extend(other.texts)
+        self.bboxes.extend(other.bboxes)
+        self.pages.extend(other.pages)
+        self.fonts.extend(other.fonts)
+        self.sizes.extend(other.sizes)
+
+    def copy(self) -> "SpanTable":
+        table = SpanTable()
+        table.extend(self)
+        return table
+
+
+def _collect_spans(
+    doc: fitz.Document, start: int, end: int, blocks_only: bool = False
+) -> SpanTable:
+    """
+    从已打开的文档中提取 [start, end) 页的文本片段
+
+    blocks_only 为 True 时按文本块而不是 span 提取，只需要文本、位置和页码时使用，
+    此时 font 为空字符串、size 为 0
+    """
+    table = SpanTable()
+    texts, bboxes, pages = table.texts, table.bboxes, table.pages
+    fonts, sizes = table.fonts, table.sizes
+    for page_num in range(start, end):
+        page = doc[page_num]
+        if blocks_only:
+            # blocks 模式直接返回扁平元组列表，不构建逐行、逐 span 的嵌套字典
+            for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+                if block_type == 0:
+                    texts.append(text)
+                    bboxes.extend((x0, y0, x1, y1))
+                    pages.append(page_num)
+                    fonts.append("")
+                    sizes.append(0.0)
+            continue
+
+        blocks = page.get_text("dict", flags=SPAN_TEXT_FLAGS)
+        for block in blocks["blocks"]:
+            if "lines" in block:
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        texts.append(span["text"])
+                        bboxes.extend(span["bbox"])
+                        pages.append(page_num)
+                        fonts.append(span["font"])
+                        sizes.append(span["size"])
+    return table
+
+
+def _extract_page_spans(
+    file_path: str, start: int, end: int, blocks_only: bool = False
+) -> SpanTable:
+    """子进程入口：各自打开文档提取 [start, end) 页，返回可序列化的列式表"""
+    with fitz.open(file_path) as doc:
+        return _collect_spans(doc, start, end, blocks_only)
+
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_search_text(text: str) -> str:
+    """
+    规范化文本用于在调用 search_for 前预筛选页面：去掉所有空白并转小写
+    （search_for 忽略大小写且可跨行匹配）
+
+    页面文本需使用与 search_for 相同的 TEXTFLAGS_SEARCH 提取（展开连字、合并断行连字符），
+    规范化后只会多判、不会漏判
+    """
+    return _WHITESPACE_PATTERN.sub("", text).lower()
+
+
+@lru_cache(maxsize=8)
+def _extract_spans_cached(
+    file_path: str,
+    mtime_ns: int,
+    size: int,
+    max_workers: int | None,
+    blocks_only: bool,
+) -> SpanTable:
+    """提取整个文档的文本片段，按 (路径, 修改时间, 大小) 缓存，文件变化后自动失效"""
+    with fitz.open(file_path) as doc:
+        page_count = doc.page_count
+        workers = min(
+            max_workers or os.cpu_count() or 1, page_count // MIN_PAGES_PER_WORKER
+        )
+        if workers <= 1:
+            # 单进程时直接复用已打开的文档，不再重复打开
+            return _collect_spans(doc, 0, page_count, blocks_only)
+
+    # 按页码区间分给多个进程并行提取，结果按页序合并
+    step = -(-page_count // workers)
+    text_blocks = SpanTable()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _extract_page_spans,
+                file_path,
+                start,
+                min(start + step, page_count),
+                blocks_only,
+            )
+            for start in range(0, page_count, step)
+        ]
+        for future in futures:
+            text_blocks.extend(future.result())
+    return text_blocks
+
+
+def parse_document(
+    file_path, max_workers: int | None = None, blocks_only: bool = False
+):
     if file_path.endswith(".pdf"):
-        doc = fitz.open(file_path)
-        text_blocks = []
-        for page_num in range(doc.page_count):
-            page = doc[page_num]
-            blocks = page.get_text("dict")
-            for block in blocks["blocks"]:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            text_blocks.append(
-                                {
-                                    "text": span["text"],
-                                    "bbox": span["bbox"],  # 位置坐标
-                                    "page": page_num,
-                                    "font": span["font"],
-                                    "size": span["size"],
-                                }
-                            )
-        return text_blocks, doc
+        stat = os.stat(file_path)
+        # 返回副本，调用方修改不会影响缓存
+        text_blocks = _extract_spans_cached(
+            file_path, stat.st_mtime_ns, stat.st_size, max_workers, blocks_only
+        ).copy()
+        # 文档对象每次重新打开，调用方会在上面添加注释
+        return text_blocks, fitz.open(file_path)
 
 
 if __name__ == "__main__":
@@ -1,57 +1,58 @@
 import os
+from types import MappingProxyType
 
 import fitz
 from dotenv import load_dotenv
 
+from pdf.pymupdf_demo.content_extract import normalize_search_text, parse_document
+
 load_dotenv()
 
-COLOR_MAP = {
-    "high": fitz.utils.getColor("red"),
-    "middle": fitz.utils.getColor("orange"),
-    "low": fitz.utils.getColor("yellow"),
-}
-
-
-def parse_document(file_path):
-    if file_path.endswith(".pdf"):
-        doc = fitz.open(file_path)
-        text_blocks = []
-        for page_num in range(doc.page_count):
-            page = doc[page_num]
-            blocks = page.get_text("dict")
-            for block in blocks["blocks"]:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            text_blocks.append(
-                                {
-                                    "text": span["text"],
-                                    "bbox": span["bbox"],  # 位置坐标
-                                    "page": page_num,
-                                    "font": span["font"],
-                                    "size": span["size"],
-                                }
-                            )
-        return text_blocks, doc
+# 严重程度对应的 RGB 颜色（与 fitz.utils.getColor 的 red、orange、yellow 相同），只读
+COLOR_MAP = MappingProxyType(
+    {
+        "high": (1.0, 0.0, 0.0),
+        "middle": (1.0, 165 / 255, 0.0),
+        "low": (1.0, 1.0, 0.0),
+    }
+)
+# 未知严重程度使用的颜色，导入时确定，不在每个问题上重复查色表
+DEFAULT_COLOR = COLOR_MAP["low"]
 
 
 def highlight_issues_in_document(doc, text_blocks, issues):
     highlighted_doc = doc
 
-    for issue in issues:
-        issue_text = issue["content"]
-        severity = issue["severity"]
-
-        # 根据严重程度设置颜色
-
-        color = COLOR_MAP.get(severity, fitz.utils.getColor("yellow"))
-
-        # 在文档中查找高亮文本
-        for page_num in range(doc.page_count):
-            page = highlighted_doc[page_num]
+    # 每个问题的规范化文本与颜色（根据严重程度设置）只计算一次
+    prepared = [
+        (
+            issue,
+            normalize_search_text(issue["content"]),
+            COLOR_MAP.get(issue["severity"], DEFAULT_COLOR),
+        )
+        for issue in issues
+    ]
+
+    # 在文档中查找高亮文本
+    for page in highlighted_doc:
+        # 每页只构建一次 TextPage，预筛选与该页所有 search_for 共用
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_SEARCH)
+        page_text = normalize_search_text(page.get_text(textpage=textpage))
+        # 问题文本 -> 命中位置，文本相同的多个问题在本页只搜索一次
+        page_hits = {}
+
+        for issue, needle, color in prepared:
+            # 页面不包含问题文本时跳过 search_for
+            if needle not in page_text:
+                continue
+
+            severity = issue["severity"]
 
             # 搜索文本位置
-            text_instances = page.search_for(issue_text)
+            content = issue["content"]
+            if content not in page_hits:
+                page_hits[content] = page.search_for(content, textpage=textpage)
+            text_instances = page_hits[content]
 
             for inst in text_instances:
                 # 添加高亮注释
@@ -70,7 +71,8 @@ def highlight_issues_in_document(doc, text_blocks, issues):
 
 if __name__ == "__main__":
     pdf_path: str = os.getenv("PDF_PATH")
-    text_blocks, doc = parse_document(pdf_path)
+    # 高亮只用到文本和位置，按文本块提取即可
+    text_blocks, doc = parse_document(pdf_path, blocks_only=True)
     # print("text_blocks:", text_blocks)
     print("doc:", doc)
 
@@ -88,4 +90,7 @@ if __name__ == "__main__":
         ],
     )
 
-    new_doc.save("output/highlighted_document.pdf")
+    # 所有注释添加完成后一次性保存：清理未引用对象、压缩流，并把大量小的注释对象打包进对象流
+    new_doc.save(
+        "output/highlighted_document.pdf", garbage=3, deflate=True, use_objstms=1
+    )
@@ -15,7 +15,8 @@ def main():
     page = doc[0]  # 第1页
 
     # 对整页进行 OCR，返回识别到的文本
-    pix: fitz.Pixmap = page.get_pixmap(dpi=300)
+    # Tesseract 内部会二值化，渲染灰度图即可，像素数据只有 RGB 的三分之一
+    pix: fitz.Pixmap = page.get_pixmap(dpi=300, colorspace=fitz.csGRAY, alpha=False)
     pix.pdfocr_save("./test.pdf")
 
 
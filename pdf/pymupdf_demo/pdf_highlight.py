@@ -1,16 +1,24 @@
 import os
+from types import MappingProxyType
 from typing import List
 
 import fitz
 from dotenv import load_dotenv
 
+from pdf.pymupdf_demo.content_extract import normalize_search_text
+
 load_dotenv()
 
-COLOR_MAP = {
-    "high": fitz.utils.getColor("red"),
-    "middle": fitz.utils.getColor("orange"),
-    "low": fitz.utils.getColor("yellow"),
-}
+# 严重程度对应的 RGB 颜色（与 fitz.utils.getColor 的 red、orange、yellow 相同），只读
+COLOR_MAP = MappingProxyType(
+    {
+        "high": (1.0, 0.0, 0.0),
+        "middle": (1.0, 165 / 255, 0.0),
+        "low": (1.0, 1.0, 0.0),
+    }
+)
+# 未知严重程度使用的颜色，导入时确定，不在每个问题上重复查色表
+DEFAULT_COLOR = COLOR_MAP["low"]
 
 
 class BaseAuditReport:
@@ -48,47 +56,115 @@ class PdfAuditReport(BaseAuditReport):
         suggestion: str = None,
         reasoning: str = None,
         page: int = -1,
+        first_match_only: bool = False,
     ):
         """
         初始化实例
-        :param page: 问题所在的页码
+        :param page: 问题所在的页码（从 1 开始），-1 表示未知
+        :param first_match_only: 是否只高亮找到的第一页，找到后不再搜索后续页面
         """
         super().__init__(content, issue_type, severity, suggestion, reasoning)
         self.page = page
+        self.first_match_only = first_match_only
+
+
+def _add_issue_annots(page: fitz.Page, issue: PdfAuditReport, color, rects) -> None:
+    for inst in rects:
+        # 添加高亮注释
+        highlight = page.add_highlight_annot(inst)
+        highlight.set_colors(stroke=color)
+        highlight.set_info(
+            title=f"审核问题 - {issue.severity}严重程度",
+            content=f"问题类型: {issue.issue_type}\n"
+            f"严重程度: {issue.severity}\n"
+            f"建议: {issue.suggestion}\n"
+            f"说明: {issue.reasoning}",
+        )
+        highlight.update()
+
+        if issue.severity == "high":
+            # 如果是高严重度问题，添加红色边框
+            border_rect = page.add_rect_annot(inst)
+            border_rect.set_colors(stroke=COLOR_MAP["high"])
+            border_rect.set_border(width=2)
+            border_rect.update()
 
 
 def add_highlight_to_pdf(pdf_path: str, issues: List[PdfAuditReport]) -> fitz.Document:
     # doc = fitz.open(stream=pdf_path, filetype="pdf")
     doc = fitz.open(pdf_path)
 
+    # 每页的 TextPage 与规范化文本只构建一次，页码提示搜索与逐页扫描共用
+    page_cache = {}
+
+    def load_page(page_number: int):
+        if page_number not in page_cache:
+            page = doc[page_number]
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_SEARCH)
+            page_text = normalize_search_text(page.get_text(textpage=textpage))
+            page_cache[page_number] = (page, textpage, page_text)
+        return page_cache[page_number]
+
+    # (页码, 问题文本) -> 命中位置，文本相同的多个问题在同一页只搜索一次
+    hits_cache = {}
+
+    def find_rects(page_number: int, content: str, needle: str) -> list:
+        key = (page_number, content)
+        if key not in hits_cache:
+            page, textpage, page_text = load_page(page_number)
+            # 页面不包含问题文本时跳过 search_for
+            hits_cache[key] = (
+                page.search_for(content, textpage=textpage)
+                if needle in page_text
+                else []
+            )
+        return hits_cache[key]
+
+    # 每个问题的规范化文本与颜色只计算一次
+    pending = []
     for issue in issues:
-        for page_num in range(doc.page_count):
-            page = doc[page_num]
+        needle = normalize_search_text(issue.content)
+        color = COLOR_MAP.get(issue.severity, DEFAULT_COLOR)
+
+        # 有页码提示时直接定位到该页，命中且只需第一处匹配时不再扫描其他页
+        if 0 < issue.page <= doc.page_count:
+            hinted_page = issue.page - 1
+            text_instances = find_rects(hinted_page, issue.content, needle)
+            if text_instances:
+                _add_issue_annots(
+                    load_page(hinted_page)[0], issue, color, text_instances
+                )
+                if issue.first_match_only:
+                    continue
+            pending.append((issue, needle, color, hinted_page))
+        else:
+            pending.append((issue, needle, color, -1))
+
+    for page_number in range(doc.page_count):
+        # 所有问题都已定位时提前结束，不再构建后续页面的 TextPage
+        if not pending:
+            break
+
+        remaining = []
+        for item in pending:
+            issue, needle, color, hinted_page = item
+            # 提示页已处理过
+            if page_number == hinted_page:
+                remaining.append(item)
+                continue
 
             # 搜索文本位置
-            text_instances = page.search_for(issue.content)
-
-            for inst in text_instances:
-                # 添加高亮注释
-                highlight = page.add_highlight_annot(inst)
-                highlight.set_colors(
-                    stroke=COLOR_MAP.get(issue.severity, COLOR_MAP.get("low"))
+            text_instances = find_rects(page_number, issue.content, needle)
+            if text_instances:
+                _add_issue_annots(
+                    load_page(page_number)[0], issue, color, text_instances
                 )
-                highlight.set_info(
-                    title=f"审核问题 - {issue.severity}严重程度",
-                    content=f"问题类型: {issue.issue_type}\n"
-                    f"严重程度: {issue.severity}\n"
-                    f"建议: {issue.suggestion}\n"
-                    f"说明: {issue.reasoning}",
-                )
-                highlight.update()
 
-                if issue.severity == "high":
-                    # 如果是高严重度问题，添加红色边框
-                    border_rect = page.add_rect_annot(inst)
-                    border_rect.set_colors(stroke=COLOR_MAP["high"])
-                    border_rect.set_border(width=2)
-                    border_rect.update()
+            if not (text_instances and issue.first_match_only):
+                remaining.append(item)
+        pending = remaining
+        # 扫描过的页面不会再被访问，及时释放其 TextPage
+        page_cache.pop(page_number, None)
 
     # doc.save("output/highlighted_document.pdf")
     # doc.close()
@@ -120,5 +196,8 @@ if __name__ == "__main__":
         ],
     )
 
-    highlighted_doc.save("output/highlighted_document.pdf")
+    # 所有注释添加完成后一次性保存：清理未引用对象、压缩流，并把大量小的注释对象打包进对象流
+    highlighted_doc.save(
+        "output/highlighted_document.pdf", garbage=3, deflate=True, use_objstms=1
+    )
     highlighted_doc.close()
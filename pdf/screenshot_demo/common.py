@@ -0,0 +1,190 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterator, List, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from common.utils import calculate_md5_file
+
+# 渲染进程数上限，超过后收益有限且内存占用明显增加
+MAX_RENDER_WORKERS = 4
+# 每个子进程至少处理的页数，页数较少时直接在当前进程处理，避免进程启动开销
+MIN_PAGES_PER_WORKER = 4
+# 页面渲染结果的磁盘缓存目录，按 PDF 内容的 MD5 分子目录存放
+PAGE_CACHE_DIR = os.path.expanduser("~/.cache/py-doc/pages")
+
+
+def map_page_ranges(
+    pdf_path: str,
+    func: Callable[..., list],
+    *args,
+    max_workers: int | None = None,
+    page_count: int | None = None,
+) -> list:
+    """
+    按页码区间把 PDF 分给多个进程处理，结果按页序拼接
+
+    func(pdf_path, start, end, *args) 在子进程中执行，需自行打开文档并返回可序列化的列表；
+    调用方已知页数时传入 page_count，避免为读取页数再打开一次文档
+    """
+    if page_count is None:
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+
+    workers = min(
+        max_workers or os.cpu_count() or 1,
+        MAX_RENDER_WORKERS,
+        page_count // MIN_PAGES_PER_WORKER,
+    )
+    if workers <= 1:
+        return func(pdf_path, 0, page_count, *args)
+
+    step = -(-page_count // workers)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(func, pdf_path, start, min(start + step, page_count), *args)
+            for start in range(0, page_count, step)
+        ]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def _render_page_range(
+    pdf_path: str, start: int, end: int, dpi: int
+) -> List[Tuple[int, int, bytes]]:
+    """渲染 [start, end) 页，返回 (宽, 高, RGB 像素数据)，Pixmap 本身不能跨进程传递"""
+    rendered = []
+    with fitz.open(pdf_path) as doc:
+        for page_number in range(start, end):
+            # 显式指定不带透明通道的 RGB，与 Image.frombytes("RGB") 的数据格式一致
+            pix = doc[page_number].get_pixmap(
+                dpi=dpi, colorspace=fitz.csRGB, alpha=False
+            )
+            rendered.append((pix.width, pix.height, pix.samples))
+    return rendered
+
+
+def render_clips(page: fitz.Page, clips: List[fitz.Rect], dpi: int = 200) -> list:
+    """
+    把同一页上的多个区域渲染为 RGB 的 Pixmap（不带透明通道）
+
+    页面内容只解析一次生成 DisplayList，所有区域都从它渲染，
+    结果与逐个调用 page.get_pixmap(clip=..., dpi=dpi) 相同
+    """
+    if not clips:
+        return []
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    display_list = page.get_displaylist()
+    return [
+        display_list.get_pixmap(
+            matrix=matrix, colorspace=fitz.csRGB, alpha=False, clip=clip
+        )
+        for clip in clips
+    ]
+
+
+def _page_cache_paths(pdf_path: str, page_count: int, dpi: int) -> List[str]:
+    """每页渲染结果的缓存路径，按 PDF 内容的 MD5 与 dpi 区分"""
+    cache_dir = os.path.join(PAGE_CACHE_DIR, calculate_md5_file(pdf_path)[:16])
+    return [
+        os.path.join(cache_dir, f"p{page_number + 1}_{dpi}.png")
+        for page_number in range(page_count)
+    ]
+
+
+def _load_cached_pages(cache_paths: List[str]) -> List[Image.Image] | None:
+    """所有页面都有缓存时读取并返回，否则返回 None"""
+    if not all(os.path.exists(path) for path in cache_paths):
+        return None
+    images = []
+    for path in cache_paths:
+        img = Image.open(path)
+        img.load()
+        images.append(img)
+    return images
+
+
+def _save_cached_pages(images: List[Image.Image], cache_paths: List[str]):
+    if cache_paths:
+        os.makedirs(os.path.dirname(cache_paths[0]), exist_ok=True)
+    for img, path in zip(images, cache_paths):
+        # 缓存只追求写入速度，使用最低压缩级别
+        img.save(path, compress_level=1)
+
+
+def render_pages(
+    pdf_path: str,
+    dpi: int = 200,
+    max_workers: int | None = None,
+    force_refresh: bool = False,
+) -> List[Image.Image]:
+    """
+    多进程渲染 PDF 的所有页面，按页序返回 RGB 图片
+
+    渲染结果按文件 MD5 与 dpi 缓存到磁盘，PDF 未变化时直接读取缓存；
+    force_refresh 为 True 时强制重新渲染
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    cache_paths = _page_cache_paths(pdf_path, page_count, dpi)
+
+    if not force_refresh:
+        images = _load_cached_pages(cache_paths)
+        if images is not None:
+            return images
+
+    images = [
+        Image.frombytes("RGB", (width, height), samples)
+        for width, height, samples in map_page_ranges(
+            pdf_path,
+            _render_page_range,
+            dpi,
+            max_workers=max_workers,
+            page_count=page_count,
+        )
+    ]
+    _save_cached_pages(images, cache_paths)
+    return images
+
+
+def iter_page_batches(
+    pdf_path: str, batch_size: int, dpi: int = 200, force_refresh: bool = False
+) -> Iterator[List[Image.Image]]:
+    """
+    按页序逐批返回 RGB 页面图片，每批最多 batch_size 页
+
+    后台线程在调用方处理当前批（如模型推理）时预先渲染下一批，渲染与处理重叠；
+    与 render_pages 共用磁盘缓存
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    cache_paths = _page_cache_paths(pdf_path, page_count, dpi)
+
+    def load_batch(start: int) -> List[Image.Image]:
+        end = min(start + batch_size, page_count)
+        batch_paths = cache_paths[start:end]
+        if not force_refresh:
+            images = _load_cached_pages(batch_paths)
+            if images is not None:
+                return images
+
+        images = [
+            Image.frombytes("RGB", (width, height), samples)
+            for width, height, samples in _render_page_range(pdf_path, start, end, dpi)
+        ]
+        _save_cached_pages(images, batch_paths)
+        return images
+
+    starts = range(0, page_count, batch_size)
+    if not starts:
+        return
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(load_batch, starts[0])
+        for next_start in starts[1:]:
+            images = future.result()
+            future = executor.submit(load_batch, next_start)
+            yield images
+        yield future.result()
@@ -1,11 +1,13 @@
 import logging
 import os
+import sys
 
-import fitz  # PyMuPDF
-from PIL import Image
+import torch
 from dotenv import load_dotenv
 from ultralytics import YOLO
 
+from pdf.screenshot_demo.common import render_pages
+
 load_dotenv()
 
 logging.basicConfig(
@@ -16,40 +18,43 @@ _log = logging.getLogger(__name__)
 
 MODEL_PATH = os.getenv("MODEL_PATH")
 
+device = "cuda" if torch.cuda.is_available() else "cpu"
+# GPU 上使用半精度推理，CPU 保持 FP32
+half = device == "cuda"
 
-def main():
-    pdf_path: str = os.getenv("PDF_PATH")
+# 模型在导入时加载一次，并把 BatchNorm 融合进卷积层
+model = YOLO(MODEL_PATH)  # pretrained YOLO11n model
+model.fuse()
 
-    # 打开PDF
-    doc: fitz.Document = fitz.open(pdf_path)
 
-    model = YOLO(MODEL_PATH)  # pretrained YOLO11n model
+def main():
+    pdf_path: str = os.getenv("PDF_PATH")
 
-    for page_number in range(len(doc)):
-        page = doc[page_number]
-        pix = page.get_pixmap(dpi=200)
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    # 多进程渲染所有页面，推理仍在主进程中进行
+    # 页面渲染结果有磁盘缓存，传入 --force-refresh 时忽略缓存重新渲染
+    images = render_pages(
+        pdf_path, dpi=200, force_refresh="--force-refresh" in sys.argv
+    )
 
-        processed_result = model(img, imgsz=960)
+    # 所有页面一次性送入模型批量推理，每页对应一个结果
+    processed_result = model(images, imgsz=960, device=device, half=half, verbose=False)
 
-        for result in processed_result:
-            boxes = result.boxes  # Boxes object for bounding box outputs
-            result.show()  # display to screen
-            result.save(filename="result.jpg")  # save to disk
+    for page_number, (img, result) in enumerate(zip(images, processed_result)):
+        boxes = result.boxes  # Boxes object for bounding box outputs
 
-            print(boxes.xyxy)
+        print(boxes.xyxy)
 
-            print(f"第 {page_number + 1} 页检测到 {len(boxes.xyxy)} 个表格/对象")
+        print(f"第 {page_number + 1} 页检测到 {len(boxes.xyxy)} 个表格/对象")
 
-            for i, box in enumerate(boxes.xyxy):
-                (xmin, ymin, xmax, ymax) = box.tolist()
-                print(
-                    f"  表格 {i} - xmin: {xmin}, ymin: {ymin}, xmax: {xmax}, ymax: {ymax}"
-                )
+        for i, box in enumerate(boxes.xyxy):
+            (xmin, ymin, xmax, ymax) = box.tolist()
+            print(
+                f"  表格 {i} - xmin: {xmin}, ymin: {ymin}, xmax: {xmax}, ymax: {ymax}"
+            )
 
-                png_name = f"p{page_number + 1}_t{i}.png"
-                cropped_img = img.crop((xmin, ymin, xmax, ymax))
-                cropped_img.save(png_name)
+            png_name = f"p{page_number + 1}_t{i}.png"
+            cropped_img = img.crop((xmin, ymin, xmax, ymax))
+            cropped_img.save(png_name)
 
 
 if __name__ == "__main__":
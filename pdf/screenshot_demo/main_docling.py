@@ -1,12 +1,15 @@
+import io
 import logging
 import os
 import time
+from functools import lru_cache
+from itertools import groupby
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
 
 import fitz  # PyMuPDF
-from PIL import Image
-from docling.datamodel.base_models import InputFormat
+from docling.datamodel.base_models import DocumentStream, InputFormat
+from docling.datamodel.document import ConversionResult
 from docling.datamodel.pipeline_options import (
     AcceleratorDevice,
     AcceleratorOptions,
@@ -19,6 +22,8 @@ from docling_core.types import DoclingDocument
 from docling_core.types.doc import TableItem, ProvenanceItem
 from dotenv import load_dotenv
 
+from pdf.screenshot_demo.common import render_clips
+
 load_dotenv()
 
 logging.basicConfig(
@@ -37,10 +42,13 @@ class TableLocation:
         self.rect = rect
 
 
-def main():
-    pdf_path: str = os.getenv("PDF_PATH")
-    # pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
+@lru_cache(maxsize=1)
+def get_converter() -> DocumentConverter:
+    """
+    获取配置好的 docling 转换器
 
+    进程内只创建一次并预先加载 PDF 流水线的模型，转换多个文档时复用
+    """
     # docling 识别表格并获取 bbox
     pipeline_options = PdfPipelineOptions()
     pipeline_options.do_ocr = True
@@ -60,6 +68,18 @@ def main():
             InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
         }
     )
+    converter.initialize_pipeline(InputFormat.PDF)
+    return converter
+
+
+def convert_many(paths: List[Path]) -> Iterator[ConversionResult]:
+    """批量转换多个文档，共用同一个转换器，由 docling 的 convert_all 逐个返回结果"""
+    return get_converter().convert_all(paths)
+
+
+def main():
+    pdf_path: str = os.getenv("PDF_PATH")
+    # pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
 
     start_time = time.time()
     # 格式化时间
@@ -67,8 +87,12 @@ def main():
         f"开始转换文档，开始时间 [{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))}] .........."
     )
 
+    # PDF 只从磁盘读取一次，docling 转换与后面的 fitz 截图共用同一份数据
     input_doc_path = Path(pdf_path)
-    conv_result = converter.convert(input_doc_path)
+    pdf_data = input_doc_path.read_bytes()
+    conv_result = get_converter().convert(
+        DocumentStream(name=input_doc_path.name, stream=io.BytesIO(pdf_data))
+    )
 
     end_time = time.time()
     _log.info(
@@ -113,38 +137,42 @@ def main():
     _log.info("###########################")
 
     if len(table_locations) > 0:
-        # 打开PDF
-        doc: fitz.Document = fitz.open(pdf_path)
-        for table_location in table_locations:
-            # fitz 获取对应的 page
-            page: fitz.Page = doc[table_location.page_no - 1]  # page_no 从 1 开始
-            l, t, r, b = table_location.rect
-
-            page_height = page.rect.height
-            page_width = page.rect.width
-
-            # docling 的坐标与 fitz 的坐标系 y 轴是相反的
-            # 坐标系转换
-            new_t = page_height - t
-            new_b = page_height - b
-
-            # 限制在页面范围内
-            l = max(0, min(l, page_width))
-            r = max(0, min(r, page_width))
-            new_t = max(0, min(new_t, page_height))
-            new_b = max(0, min(new_b, page_height))
-
-            safe_rect = (l, new_t, r, new_b)
-
-            clip: fitz.Rect = fitz.Rect(safe_rect)
-            pix: fitz.Pixmap = page.get_pixmap(clip=clip, dpi=200)
-            # 保存为图片
-            img: Image.Image = Image.frombytes(
-                "RGB", [pix.width, pix.height], pix.samples
-            )
-
-            png_name = f"{table_location.name}.png"
-            img.save(png_name)
+        # 打开PDF（直接使用已读取的数据，不再重新读取文件）
+        with fitz.open(stream=pdf_data, filetype="pdf") as doc:
+            # 按页分组，同一页的表格只加载一次页面、解析一次页面内容
+            table_locations.sort(key=lambda location: location.page_no)
+            for page_no, page_locations in groupby(
+                table_locations, key=lambda location: location.page_no
+            ):
+                page_locations = list(page_locations)
+                # fitz 获取对应的 page
+                page: fitz.Page = doc[page_no - 1]  # page_no 从 1 开始
+                page_height = page.rect.height
+                page_width = page.rect.width
+
+                clips: List[fitz.Rect] = []
+                for table_location in page_locations:
+                    l, t, r, b = table_location.rect
+
+                    # docling 的坐标与 fitz 的坐标系 y 轴是相反的
+                    # 坐标系转换
+                    new_t = page_height - t
+                    new_b = page_height - b
+
+                    # 限制在页面范围内
+                    l = max(0, min(l, page_width))
+                    r = max(0, min(r, page_width))
+                    new_t = max(0, min(new_t, page_height))
+                    new_b = max(0, min(new_b, page_height))
+
+                    safe_rect = (l, new_t, r, new_b)
+                    clips.append(fitz.Rect(safe_rect))
+
+                pixmaps = render_clips(page, clips, dpi=200)
+                for table_location, pix in zip(page_locations, pixmaps):
+                    # 由 PyMuPDF 直接编码保存为图片，不经过 PIL
+                    png_name = f"{table_location.name}.png"
+                    pix.save(png_name)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,14 @@
+import io
 import logging
+import multiprocessing
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
+import fitz  # PyMuPDF
 from docling.datamodel.base_models import InputFormat
 from docling.datamodel.pipeline_options import (
     AcceleratorDevice,
@@ -35,10 +40,18 @@ class TableLocation:
         self.rect = rect
 
 
-def main():
-    pdf_path: str = os.getenv("PDF_PATH")
-    # pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
+# 每批转换的页数
+PAGES_PER_BATCH = 10
+# 转换进程数上限，每个进程各自加载一份模型
+MAX_CONVERT_WORKERS = 4
+# 转换线程总数，多进程时按进程数平分，避免线程数过多互相争抢 CPU
+CONVERT_THREADS = 10
+
+# 每个转换进程持有一个转换器，模型只加载一次，在该进程处理的所有批次间复用
+_converter: DocumentConverter | None = None
 
+
+def build_converter(num_threads: int) -> DocumentConverter:
     # docling 识别表格并获取 bbox
     pipeline_options = PdfPipelineOptions()
     pipeline_options.do_ocr = True
@@ -51,46 +64,41 @@ def main():
     pipeline_options.generate_page_images = True
 
     pipeline_options.accelerator_options = AcceleratorOptions(
-        num_threads=10,
+        num_threads=num_threads,
         device=AcceleratorDevice.AUTO,
     )
 
-    converter = DocumentConverter(
+    return DocumentConverter(
         format_options={
             InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
         }
     )
 
-    start_time = time.time()
-    # 格式化时间
-    _log.info(
-        f"开始转换文档，开始时间 [{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))}] .........."
-    )
 
-    input_doc_path = Path(pdf_path)
-    conv_result = converter.convert(input_doc_path)
+def _init_worker(num_threads: int):
+    global _converter
+    _converter = build_converter(num_threads)
 
-    end_time = time.time()
-    _log.info(
-        f"转换文档结束，完成时间 [{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}] .........."
-    )
-    _log.info(
-        f"转换文档状态 {conv_result.status} 耗时 [{end_time - start_time}] s .........."
-    )
 
-    _log.info("###########################")
+def _convert_batch(
+    pdf_path: str, first_page: int, last_page: int
+) -> Tuple[str, List[Tuple[str, List[Tuple[int, bytes]]]]]:
+    """
+    转换 [first_page, last_page] 页（从 1 开始，包含两端）
+
+    返回转换状态和每个表格的 (位置描述, [(页码, PNG 图片数据)])，页码为原文档中的页码
+    """
+    conv_result = _converter.convert(Path(pdf_path), page_range=(first_page, last_page))
 
     document: DoclingDocument = conv_result.document
     # 获取 table 的数量、位置
     tables: List[TableItem] = document.tables
-    _log.info(f"文档的表格数量 {len(tables)} ---- ")
 
-    output_dir = Path("output")
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    for i, table in enumerate(tables):
+    located_tables = []
+    for table in tables:
         prov: List[ProvenanceItem] = table.prov
         location: str = ""
+        images = []
         for e in prov:
             page_no = e.page_no
             bbox = e.bbox
@@ -104,9 +112,72 @@ def main():
                 f"表格位置: left {bbox.l} top {bbox.t} right {bbox.r} bottom {bbox.b} - \n"
             )
 
+            # 表格图片在子进程中编码为 PNG，由主进程按全局表格序号写入文件
+            buffer = io.BytesIO()
+            table.get_image(document).save(buffer, "PNG")
+            images.append((page_no, buffer.getvalue()))
+
+        located_tables.append((location, images))
+
+    return str(conv_result.status), located_tables
+
+
+def main():
+    pdf_path: str = os.getenv("PDF_PATH")
+    # pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
+
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    # 按页码区间分批，docling 的 page_range 从 1 开始且包含两端
+    first_pages = list(range(1, page_count + 1, PAGES_PER_BATCH))
+    last_pages = [min(p + PAGES_PER_BATCH - 1, page_count) for p in first_pages]
+    workers = min(MAX_CONVERT_WORKERS, len(first_pages), os.cpu_count() or 1)
+
+    start_time = time.time()
+    # 格式化时间
+    _log.info(
+        f"开始转换文档，开始时间 [{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))}] .........."
+    )
+
+    if workers <= 1:
+        _init_worker(CONVERT_THREADS)
+        batch_results = [
+            _convert_batch(pdf_path, first, last)
+            for first, last in zip(first_pages, last_pages)
+        ]
+    else:
+        # 模型库不宜在 fork 出的子进程中使用，使用 spawn 启动，每个进程初始化时加载一次模型
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(max(1, CONVERT_THREADS // workers),),
+        ) as executor:
+            batch_results = list(
+                executor.map(_convert_batch, repeat(pdf_path), first_pages, last_pages)
+            )
+
+    end_time = time.time()
+    _log.info(
+        f"转换文档结束，完成时间 [{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}] .........."
+    )
+    _log.info(
+        f"转换文档状态 {[status for status, _ in batch_results]} 耗时 [{end_time - start_time}] s .........."
+    )
+
+    _log.info("###########################")
+
+    # 按页序合并各批次的表格
+    tables = [table for _, batch_tables in batch_results for table in batch_tables]
+    _log.info(f"文档的表格数量 {len(tables)} ---- ")
+
+    output_dir = Path("output")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for i, (location, images) in enumerate(tables):
+        for page_no, png_data in images:
             # 导入表格图片
-            with (output_dir / f"p{page_no}_t{i}.png").open("wb") as fp:
-                table.get_image(conv_result.document).save(fp, "PNG")
+            (output_dir / f"p{page_no}_t{i}.png").write_bytes(png_data)
 
         _log.info(f"表格 {i} 的位置: {location} ---- ")
 
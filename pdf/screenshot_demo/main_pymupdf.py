@@ -1,11 +1,14 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import fitz  # PyMuPDF
 import pymupdf.table
 from PIL import Image
 from dotenv import load_dotenv
 
+from pdf.screenshot_demo.common import map_page_ranges, render_clips
+
 load_dotenv()
 
 logging.basicConfig(
@@ -14,24 +17,24 @@ logging.basicConfig(
 )
 _log = logging.getLogger(__name__)
 
+# 保存截图的线程数
+SAVE_WORKERS = 4
 
-def main():
-    """
-    从 PDF 中截取表格区域并保存为图片
-    例外：PDF 中有图片，图片中有表格，无法截取
-    """
-    pdf_path: str = os.getenv("PDF_PATH")
-    pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
 
-    # 打开PDF
-    doc: fitz.Document = fitz.open(pdf_path)
+def _capture_tables(pdf_path: str, start: int, end: int) -> list:
+    """
+    查找 [start, end) 页中的表格并截图（在子进程中执行）
 
-    if doc.page_count > 0:
-        for page in doc:
+    返回每页的 (页码, 表格截图列表, 图片数量)，截图为 (宽, 高, RGB 像素数据)
+    """
+    captured = []
+    with fitz.open(pdf_path) as doc:
+        for page_number in range(start, end):
+            page = doc[page_number]
             find_tables: pymupdf.table.TableFinder = fitz.find_tables(page)
 
-            _log.info("找到 %d 个表格", len(find_tables.tables))
-            for i, table in enumerate(find_tables.tables):
+            clips = []
+            for table in find_tables.tables:
                 (x0, y0, x1, y1) = table.bbox
 
                 # # 截图区域
@@ -41,24 +44,48 @@ def main():
                     x1,
                     y1,
                 )  # (x0, y0, x1, y1) 左上和右下坐标
-                clip: fitz.Rect = fitz.Rect(rect)
-                pix: fitz.Pixmap = page.get_pixmap(
-                    clip=clip, dpi=200
-                )  # 可调整dpi提高清晰度
+                clips.append(fitz.Rect(rect))
+
+            # 同一页的所有表格共用一次页面解析，可调整dpi提高清晰度
+            tables = [
+                (pix.width, pix.height, pix.samples)
+                for pix in render_clips(page, clips, dpi=200)
+            ]
 
+            captured.append((page_number, tables, len(page.get_images())))
+    return captured
+
+
+def main():
+    """
+    从 PDF 中截取表格区域并保存为图片
+    例外：PDF 中有图片，图片中有表格，无法截取
+    """
+    pdf_path: str = os.getenv("PDF_PATH")
+    pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
+
+    # 多进程查找表格并截图，图片交给线程池保存（PNG 编码与写盘会释放 GIL），与后续处理重叠
+    with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as io_pool:
+        futures = []
+        for page_number, tables, image_count in map_page_ranges(
+            pdf_path, _capture_tables
+        ):
+            _log.info("找到 %d 个表格", len(tables))
+            for i, (width, height, samples) in enumerate(tables):
                 # 保存为图片
-                img: Image.Image = Image.frombytes(
-                    "RGB", [pix.width, pix.height], pix.samples
+                img: Image.Image = Image.frombytes("RGB", [width, height], samples)
+
+                png_name = f"png_{pdf_basename}_p{page_number}_t{i}.png"
+                futures.append(
+                    (png_name, io_pool.submit(img.save, png_name, compress_level=1))
                 )
 
-                png_name = f"png_{pdf_basename}_p{page.number}_t{i}.png"
-                img.save(png_name)
-                _log.info("截图已保存为:", png_name)
+            _log.info("找到 %d 张图片", image_count)
 
-            images = page.get_images()
-            _log.info("找到 %d 张图片", len(images))
-            # for img_index, image in enumerate(images):
-            #     _log.info(image)
+        for png_name, future in futures:
+            # 保存失败时在这里抛出异常
+            future.result()
+            _log.info("截图已保存为: %s", png_name)
 
 
 if __name__ == "__main__":
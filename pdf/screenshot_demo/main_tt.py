@@ -1,12 +1,13 @@
 import logging
 import os
+import sys
 
-import fitz  # PyMuPDF
 import torch
-from PIL import Image
 from dotenv import load_dotenv
 from transformers import TableTransformerForObjectDetection, DetrImageProcessor
 
+from pdf.screenshot_demo.common import iter_page_batches
+
 load_dotenv()
 
 logging.basicConfig(
@@ -15,34 +16,56 @@ logging.basicConfig(
 )
 _log = logging.getLogger(__name__)
 
-model = TableTransformerForObjectDetection.from_pretrained(
-    "microsoft/table-transformer-detection"
+device = "cuda" if torch.cuda.is_available() else "cpu"
+# GPU 上使用半精度推理，CPU 保持 FP32
+dtype = torch.float16 if device == "cuda" else torch.float32
+# 每次前向推理的页数，限制页数多时的显存/内存占用
+BATCH_SIZE = 8
+
+model = (
+    TableTransformerForObjectDetection.from_pretrained(
+        "microsoft/table-transformer-detection", torch_dtype=dtype
+    )
+    .to(device)
+    .eval()
 )
+if device == "cpu":
+    # CPU 上把线性层动态量化为 int8，DETR 的 Transformer 与预测头主要由线性层组成
+    model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
 
 
 def main():
     pdf_path: str = os.getenv("PDF_PATH")
     pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
 
-    # 打开PDF
-    doc: fitz.Document = fitz.open(pdf_path)
     detr_image_processor = DetrImageProcessor()
 
-    for page_number in range(len(doc)):
-        page = doc[page_number]
-        pix = page.get_pixmap(dpi=200)
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-
-        encoding = detr_image_processor(img, return_tensors="pt")
-        with torch.no_grad():
+    # 后台线程渲染下一批页面的同时，主线程对当前批推理
+    # 页面渲染结果有磁盘缓存，传入 --force-refresh 时忽略缓存重新渲染
+    page_offset = 0
+    for batch in iter_page_batches(
+        pdf_path, BATCH_SIZE, dpi=200, force_refresh="--force-refresh" in sys.argv
+    ):
+        # 同一批预处理为一个张量（尺寸不同时自动填充并生成 pixel_mask），一次前向推理
+        encoding = detr_image_processor(batch, return_tensors="pt").to(device)
+        encoding["pixel_values"] = encoding["pixel_values"].to(dtype)
+        with torch.inference_mode():
             outputs = model(**encoding)
+        # 后处理前转回 FP32，保证坐标精度
+        outputs.logits = outputs.logits.float()
+        outputs.pred_boxes = outputs.pred_boxes.float()
 
-        width, height = img.size
         processed_result = detr_image_processor.post_process_object_detection(
-            outputs, threshold=0.7, target_sizes=[(height, width)]
+            outputs,
+            threshold=0.7,
+            target_sizes=[(img.height, img.width) for img in batch],
         )
 
-        for results in processed_result:
+        for page_number, (img, results) in enumerate(
+            zip(batch, processed_result), start=page_offset
+        ):
             boxes = results["boxes"]
 
             print(f"第 {page_number + 1} 页检测到 {len(boxes)} 个表格/对象")
@@ -56,6 +79,8 @@ def main():
                 cropped_img = img.crop((xmin, ymin, xmax, ymax))
                 cropped_img.save(png_name)
 
+        page_offset += len(batch)
+
 
 if __name__ == "__main__":
     main()
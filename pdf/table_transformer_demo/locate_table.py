@@ -11,9 +11,22 @@ from pdf.table_transformer_demo.utils import plot_results
 # 加载 .env 文件
 load_dotenv()
 
-model = TableTransformerForObjectDetection.from_pretrained(
-    "microsoft/table-transformer-detection"
+device = "cuda" if torch.cuda.is_available() else "cpu"
+# GPU 上使用半精度推理，CPU 保持 FP32
+dtype = torch.float16 if device == "cuda" else torch.float32
+
+model = (
+    TableTransformerForObjectDetection.from_pretrained(
+        "microsoft/table-transformer-detection", torch_dtype=dtype
+    )
+    .to(device)
+    .eval()
 )
+if device == "cpu":
+    # CPU 上把线性层动态量化为 int8，DETR 的 Transformer 与预测头主要由线性层组成
+    model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
 
 
 def main():
@@ -25,13 +38,17 @@ def main():
     image.resize((int(width * 0.5), int(height * 0.5)))
 
     detr_image_processor = DetrImageProcessor()
-    encoding = detr_image_processor(image, return_tensors="pt")
+    encoding = detr_image_processor(image, return_tensors="pt").to(device)
+    encoding["pixel_values"] = encoding["pixel_values"].to(dtype)
     encoding.keys()
 
     print(encoding["pixel_values"].shape)
 
-    with torch.no_grad():
+    with torch.inference_mode():
         outputs = model(**encoding)
+    # 后处理前转回 FP32，保证坐标精度
+    outputs.logits = outputs.logits.float()
+    outputs.pred_boxes = outputs.pred_boxes.float()
 
     width, height = image.size
     print(f"图片大小: {width} x {height}")
@@ -1,8 +1,8 @@
 import os
 
 import fitz  # PyMuPDF
+import numpy as np
 import torch
-from PIL import Image
 from dotenv import load_dotenv
 from transformers import TableTransformerForObjectDetection, DetrImageProcessor
 
@@ -10,9 +10,22 @@ from pdf.table_transformer_demo.utils import plot_results
 
 load_dotenv()
 
-model = TableTransformerForObjectDetection.from_pretrained(
-    "microsoft/table-transformer-detection"
+device = "cuda" if torch.cuda.is_available() else "cpu"
+# GPU 上使用半精度推理，CPU 保持 FP32
+dtype = torch.float16 if device == "cuda" else torch.float32
+
+model = (
+    TableTransformerForObjectDetection.from_pretrained(
+        "microsoft/table-transformer-detection", torch_dtype=dtype
+    )
+    .to(device)
+    .eval()
 )
+if device == "cpu":
+    # CPU 上把线性层动态量化为 int8，DETR 的 Transformer 与预测头主要由线性层组成
+    model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
 
 
 def process_pdf(pdf_path):
@@ -21,14 +34,22 @@ def process_pdf(pdf_path):
     detr_image_processor = DetrImageProcessor()
     for page_number in range(len(doc)):
         page = doc[page_number]
-        pix = page.get_pixmap(dpi=200)
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        pix = page.get_pixmap(dpi=200, colorspace=fitz.csRGB, alpha=False)
+        # 直接把 Pixmap 的像素缓冲区视为 (高, 宽, 3) 数组交给处理器，不复制到 PIL 图片
+        # 数组引用 pix 的内存，只在本次循环内使用
+        img = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(
+            pix.height, pix.width, 3
+        )
 
-        encoding = detr_image_processor(img, return_tensors="pt")
-        with torch.no_grad():
+        encoding = detr_image_processor(img, return_tensors="pt").to(device)
+        encoding["pixel_values"] = encoding["pixel_values"].to(dtype)
+        with torch.inference_mode():
             outputs = model(**encoding)
+        # 后处理前转回 FP32，保证坐标精度
+        outputs.logits = outputs.logits.float()
+        outputs.pred_boxes = outputs.pred_boxes.float()
 
-        width, height = img.size
+        height, width = img.shape[:2]
 
         processed_result = detr_image_processor.post_process_object_detection(
             outputs, threshold=0.7, target_sizes=[(height, width)]
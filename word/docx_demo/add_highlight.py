@@ -6,7 +6,7 @@ from docx import Document
 from docx.shared import RGBColor
 from dotenv import load_dotenv
 
-from word.docx_demo.common import copy_font_format
+from word.docx_demo.common import CharFormatIndex, copy_font_format
 
 load_dotenv()
 
@@ -27,6 +27,9 @@ def add_highlights(file_path: str, words: List[str]):
 
     # 按词语长度降序排序，优先处理长词，避免短词干扰长词的匹配
     sorted_words = sorted(words, key=len, reverse=True)
+    target_words = set(sorted_words)
+    # 构建正则表达式，匹配所有目标词语；只编译一次，分组用于 split 时保留分隔符
+    pattern = re.compile(f"({'|'.join(re.escape(word) for word in sorted_words)})")
 
     for i, paragraph in enumerate(doc.paragraphs):
         full_text = paragraph.text
@@ -38,21 +41,11 @@ def add_highlights(file_path: str, words: List[str]):
 
         print(f"index: {i}, original text: {full_text}")
 
-        # 创建字符到格式的映射
-        char_formats = []
-        char_index = 0
-
-        for run in paragraph.runs:
-            run_text = run.text
-            for char in run_text:
-                char_formats.append(run.font)
-                char_index += 1
-
-        # 构建正则表达式，匹配所有目标词语
-        pattern = "|".join(re.escape(word) for word in sorted_words)
+        # 创建字符位置到格式的索引
+        char_formats = CharFormatIndex(paragraph)
 
         # 分割文本，保留分隔符
-        parts = re.split(f"({pattern})", full_text)
+        parts = pattern.split(full_text)
 
         # 清空段落的所有runs
         for run in paragraph.runs:
@@ -68,49 +61,29 @@ def add_highlights(file_path: str, words: List[str]):
             if not part:  # 跳过空字符串
                 continue
 
-            if part in sorted_words:
+            if part in target_words:
                 # 添加高亮的目标词
                 highlight_run = paragraph.add_run(f"「{part}」")
                 highlight_run.font.color.rgb = RGBColor(255, 0, 0)
 
                 # 继承原文字的格式（除了颜色）
                 if current_pos < len(char_formats):
-                    source_font = char_formats[current_pos]
+                    source_font = char_formats.font_at(current_pos)
                     copy_font_format(source_font, highlight_run.font)
             else:
-                # 对于普通文本，按字符重建，保持原有格式
-                start_pos = current_pos
-                for char_idx, char in enumerate(part):
-                    format_idx = start_pos + char_idx
-                    if format_idx < len(char_formats):
-                        # 为每个字符创建单独的run（如果格式不同）
-                        if char_idx == 0 or (
-                            format_idx > 0
-                            and char_formats[format_idx] != char_formats[format_idx - 1]
-                        ):
-                            # 创建新的run
-                            char_run = paragraph.add_run(char)
-                            copy_font_format(char_formats[format_idx], char_run.font)
-                            # 保持原有颜色
-                            if char_formats[format_idx].color.rgb:
-                                char_run.font.color.rgb = char_formats[
-                                    format_idx
-                                ].color.rgb
-                        else:
-                            # 添加到最后一个run
-                            if paragraph.runs:
-                                paragraph.runs[-1].text += char
-                    else:
-                        # 如果超出了格式范围，使用最后一个可用格式
-                        if char_idx == 0:
-                            char_run = paragraph.add_run(char)
-                            if char_formats:
-                                copy_font_format(char_formats[-1], char_run.font)
-                                if char_formats[-1].color.rgb:
-                                    char_run.font.color.rgb = char_formats[-1].color.rgb
-                        else:
-                            if paragraph.runs:
-                                paragraph.runs[-1].text += char
+                # 对于普通文本，按来源 run 分段重建，保持原有格式；
+                # 超出格式范围的字符使用最后一个可用格式
+                for segment_start, segment_end, source_font in char_formats.segments(
+                    current_pos, current_pos + len(part)
+                ):
+                    segment_run = paragraph.add_run(
+                        full_text[segment_start:segment_end]
+                    )
+                    if source_font is not None:
+                        copy_font_format(source_font, segment_run.font)
+                        # 保持原有颜色
+                        if source_font.color.rgb:
+                            segment_run.font.color.rgb = source_font.color.rgb
 
             current_pos += len(part)
 
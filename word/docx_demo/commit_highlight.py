@@ -7,7 +7,7 @@ from docx import Document
 from docx.text.paragraph import Paragraph
 from dotenv import load_dotenv
 
-from word.docx_demo.common import copy_font_format
+from word.docx_demo.common import CharFormatIndex, copy_font_format
 
 load_dotenv()
 
@@ -56,7 +56,7 @@ def _add_comment(doc, run, config: AnnotationConfig, word: str):
 
 
 def _add_normal_text(
-    paragraph: Paragraph, text: str, char_formats: List, start_pos: int
+    paragraph: Paragraph, text: str, char_formats: CharFormatIndex, start_pos: int
 ):
     """
     添加普通文本，保持原有格式
@@ -64,61 +64,24 @@ def _add_normal_text(
     Args:
         paragraph: 目标段落
         text: 目标文本
-        char_formats: 每个字符对应的格式列表
+        char_formats: 字符位置到格式的索引
         start_pos: 当前文本在段落中的起始位置
 
     Returns:
         None
     """
-    for char_idx, char in enumerate(text):
-        format_idx = start_pos + char_idx
-
-        if format_idx < len(char_formats):
-            # 检查是否需要创建新run
-            need_new_run = char_idx == 0 or (
-                format_idx > 0
-                and char_formats[format_idx] != char_formats[format_idx - 1]
-            )
-
-            if need_new_run:
-                char_run = paragraph.add_run(char)
-                copy_font_format(char_formats[format_idx], char_run.font)
-                # 保持原有颜色，copy_font_format 没有复制颜色
-                if char_formats[format_idx].color.rgb:
-                    char_run.font.color.rgb = char_formats[format_idx].color.rgb
-            else:
-                # 添加到最后一个run
-                if paragraph.runs:
-                    paragraph.runs[-1].text += char
-        else:
-            # 使用最后可用格式
-            _add_char_with_fallback_format(paragraph, char, char_formats, char_idx)
-
-
-def _add_char_with_fallback_format(
-    paragraph: Paragraph, char: str, char_formats: List, char_idx: int
-):
-    """
-    使用备用格式添加字符
-
-    Args:
-        paragraph: 目标段落
-        char: 目标字符
-        char_formats: 每个字符对应的格式列表
-        char_idx: 当前字符索引
-
-    Returns:
-        None
-    """
-    if char_idx == 0:
-        char_run = paragraph.add_run(char)
-        if char_formats:
-            copy_font_format(char_formats[-1], char_run.font)
-            if char_formats[-1].color.rgb:
-                char_run.font.color.rgb = char_formats[-1].color.rgb
-    else:
-        if paragraph.runs:
-            paragraph.runs[-1].text += char
+    # 按来源 run 分段，每段创建一个 run；超出格式范围的字符使用最后可用格式
+    for segment_start, segment_end, source_font in char_formats.segments(
+        start_pos, start_pos + len(text)
+    ):
+        segment_run = paragraph.add_run(
+            text[segment_start - start_pos : segment_end - start_pos]
+        )
+        if source_font is not None:
+            copy_font_format(source_font, segment_run.font)
+            # 保持原有颜色，copy_font_format 没有复制颜色
+            if source_font.color.rgb:
+                segment_run.font.color.rgb = source_font.color.rgb
 
 
 def _apply_annotation_format(run, config: AnnotationConfig):
@@ -197,21 +160,17 @@ def _apply_font_color(run, color_name: str):
     run.font.color.rgb = color_map.get(color_name.lower(), RGBColor(0, 0, 0))
 
 
-def _create_char_format_mapping(paragraph: Paragraph) -> List:
+def _create_char_format_mapping(paragraph: Paragraph) -> CharFormatIndex:
     """
-    创建字符到格式的映射
+    创建字符位置到格式的索引
 
     Args:
         paragraph: 目标段落
 
     Returns:
-        List 每个字符对应的格式列表
+        CharFormatIndex 按字符位置查找所在 run 格式的索引
     """
-    char_formats = []
-    for run in paragraph.runs:
-        for _ in run.text:
-            char_formats.append(run.font)
-    return char_formats
+    return CharFormatIndex(paragraph)
 
 
 def _clear_paragraph_runs(paragraph: Paragraph):
@@ -244,8 +203,10 @@ class DocumentAnnotator:
         self.word_configs = word_configs
         # 将词语按长度排序，防止子串冲突，如 "喵喵公司" "公司" "喵"
         self.sorted_words = sorted(word_configs.keys(), key=len, reverse=True)
-        # 构建正则表达式模式，如 "喵喵公司|公司|喵"
-        self.pattern = "|".join(re.escape(word) for word in self.sorted_words)
+        # 预编译正则表达式，如 "(喵喵公司|公司|喵)"，分组用于 split 时保留分隔符
+        self.pattern = re.compile(
+            f"({'|'.join(re.escape(word) for word in self.sorted_words)})"
+        )
 
     def annotate_document(self, file_path: str) -> str:
         """
@@ -341,7 +302,7 @@ class DocumentAnnotator:
             char_formats = _create_char_format_mapping(paragraph)
 
             # 分割文本
-            parts = re.split(f"({self.pattern})", full_text)
+            parts = self.pattern.split(full_text)
 
             # 清空并重建段落
             _clear_paragraph_runs(paragraph)
@@ -353,7 +314,11 @@ class DocumentAnnotator:
             print(f"处理段落 ({index + 1})时发生错误: {e}")
 
     def _rebuild_paragraph(
-        self, paragraph: Paragraph, parts: List[str], char_formats: List, doc
+        self,
+        paragraph: Paragraph,
+        parts: List[str],
+        char_formats: CharFormatIndex,
+        doc,
     ):
         """
         重建段落内容
@@ -361,7 +326,7 @@ class DocumentAnnotator:
         Args:
             paragraph: 目标段落
             parts: 分割后的文本部分列表
-            char_formats: 每个字符对应的格式列表
+            char_formats: 字符位置到格式的索引
             doc: 当前文档对象
 
         Returns:
@@ -373,7 +338,7 @@ class DocumentAnnotator:
             if not part:  # 跳过空字符串
                 continue
 
-            if part in self.sorted_words:
+            if part in self.word_configs:
                 self._add_annotated_word(
                     paragraph, part, char_formats, current_pos, doc
                 )
@@ -383,7 +348,12 @@ class DocumentAnnotator:
             current_pos += len(part)
 
     def _add_annotated_word(
-        self, paragraph: Paragraph, word: str, char_formats: List, current_pos: int, doc
+        self,
+        paragraph: Paragraph,
+        word: str,
+        char_formats: CharFormatIndex,
+        current_pos: int,
+        doc,
     ):
         """
         添加标注的词语
@@ -391,7 +361,7 @@ class DocumentAnnotator:
         Args:
             paragraph: 目标段落
             word: 目标词语
-            char_formats: 每个字符对应的格式列表
+            char_formats: 字符位置到格式的索引
             current_pos: 当前字符位置
             doc: 当前文档对象
 
@@ -415,7 +385,7 @@ class DocumentAnnotator:
         # 继承原格式
         if current_pos < len(char_formats):
             # 找出当前词语原有的格式，复制到新 run
-            copy_font_format(char_formats[current_pos], target_run.font)
+            copy_font_format(char_formats.font_at(current_pos), target_run.font)
 
         # 应用标注格式
         _apply_annotation_format(target_run, config)
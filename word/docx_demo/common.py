@@ -1,4 +1,8 @@
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+
 from docx.text.font import Font
+from docx.text.paragraph import Paragraph
 
 
 def copy_font_format(source_font: Font, target_font: Font):
@@ -19,3 +23,63 @@ def copy_font_format(source_font: Font, target_font: Font):
             pass
     except Exception:
         pass
+
+
+class CharFormatIndex:
+    """
+    段落中字符位置到所在 run 格式的索引
+
+    只记录每个非空 run 的起始位置和格式，按位置二分查找，不为每个字符保存一份格式
+    """
+
+    def __init__(self, paragraph: Paragraph):
+        self.starts: List[int] = []
+        self.fonts: List[Font] = []
+        position = 0
+        for run in paragraph.runs:
+            length = len(run.text)
+            if length:
+                self.starts.append(position)
+                self.fonts.append(run.font)
+                position += length
+        self.length = position
+
+    def __len__(self) -> int:
+        return self.length
+
+    def font_at(self, position: int) -> Optional[Font]:
+        """获取第 position 个字符所在 run 的格式，超出范围时返回最后一个格式"""
+        if not self.fonts:
+            return None
+        if position >= self.length:
+            return self.fonts[-1]
+        return self.fonts[bisect_right(self.starts, position) - 1]
+
+    def segments(
+        self, start: int, end: int
+    ) -> Iterator[Tuple[int, int, Optional[Font]]]:
+        """
+        把 [start, end) 按字符所在的 run 切分为 (起始位置, 结束位置, 格式)
+
+        超出范围的字符使用最后一个格式，并与同样来自最后一个 run 的前一段合并
+        """
+        if start >= end:
+            return
+        if start >= self.length:
+            yield start, end, self.font_at(start)
+            return
+
+        index = bisect_right(self.starts, start) - 1
+        while index < len(self.starts):
+            run_end = (
+                self.starts[index + 1] if index + 1 < len(self.starts) else self.length
+            )
+            if index == len(self.starts) - 1:
+                # 最后一个 run 包含其后超出范围的字符
+                run_end = max(run_end, end)
+            segment_end = min(run_end, end)
+            yield start, segment_end, self.fonts[index]
+            if segment_end >= end:
+                return
+            start = segment_end
+            index += 1